@@ -2,18 +2,27 @@
 """
 Generate GitHub stats SVG cards for PeterBenc.
 - Stars: personal repos + STAR_REPOS
-- Commits/PRs/Issues: ALL-TIME from contributionsCollection (loops through years)
+- Commits/PRs/Issues: ALL-TIME from contributionsCollection (one alias per year)
 - Lines changed + Languages: from personal repos + CONTRIBUTION_REPOS
 """
 
 import os
+import sys
 import json
+import functools
+from collections import Counter
+import asyncio
+import aiohttp
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import math
 import time
-from datetime import datetime
+from datetime import datetime, timezone
 
 USERNAME = "PeterBenc"
+USERNAME_LC = USERNAME.lower()
 START_YEAR = 2016  # Year you started on GitHub
 
 # ============================================================
@@ -59,22 +68,97 @@ API_URL = "https://api.github.com/graphql"
 HEADERS = {"Authorization": f"bearer {TOKEN}", "Content-Type": "application/json"}
 REST_HEADERS = {"Authorization": f"token {TOKEN}", "Accept": "application/vnd.github.v3+json"}
 
+RETRY_STATUSES = [502, 503, 504]
+RETRY_BACKOFF = 0.5  # urllib3 backoff_factor: retries sleep 0, 1, 2s
+
+# Pooled keep-alive session for GraphQL calls.
+# Queries are read-only, so POST is safe to retry on transient 5xx.
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=20,
+    pool_maxsize=20,
+    max_retries=Retry(total=3, backoff_factor=RETRY_BACKOFF, status_forcelist=RETRY_STATUSES, allowed_methods=None),
+))
+
+SCAN_CONCURRENCY = 10  # Concurrent REST requests during the repo scan
+STATS_POLL_BUDGET = 380  # Seconds to keep re-polling /stats/contributors while it returns 202
+
+GRAPHQL_ALIAS_LIMIT = 50  # Max aliased nodes per GraphQL request
+
+# Conditional-request cache for REST responses, persisted across CI runs (see stats.yml).
+# Maps url -> {"etag": ..., "last_modified": ..., "payload": ...}; a 304 reply is served from here.
+CACHE_PATH = "profile/.gh_cache.json"
+HTTP_CACHE = {}
+
+# Core REST budget, seeded from GET /rate_limit and refreshed from the
+# X-RateLimit-* headers of every REST response.
+# "outstanding" is the REST work the scan still expects to send; requests are
+# paced only when the budget can't cover it, from "next_send" onwards.
+RATE_LIMIT = {"remaining": None, "reset": 0, "outstanding": 0, "next_send": 0}
+RATE_LIMIT_LOCK = asyncio.Lock()
+MAX_RETRY_WAIT = 300  # Cap (seconds) on a single Retry-After / pacing sleep
+
+
+def rate_limit_delay(status, headers, body):
+    """
+    Seconds to wait before retrying a rate-limited 403/429, or None if the
+    response is not a rate limit (e.g. a plain no-access 403).
+    """
+    if status not in (403, 429):
+        return None
+    if headers.get("X-RateLimit-Remaining") == "0":
+        # Primary limit: wait for the window to reset
+        return max(0, int(headers.get("X-RateLimit-Reset", 0)) - time.time()) + 1
+    if headers.get("Retry-After") is not None:
+        return min(int(headers["Retry-After"]), MAX_RETRY_WAIT)
+    # Secondary limit without Retry-After: GitHub asks to wait at least a minute
+    if status == 429 or b"secondary rate limit" in body.lower():
+        return 60
+    return None
+
 
 def graphql(query, variables=None):
-    r = requests.post(API_URL, json={"query": query, "variables": variables or {}}, headers=HEADERS)
+    payload = orjson.dumps({"query": query, "variables": variables or {}})
+    for attempt in range(4):
+        r = SESSION.post(API_URL, data=payload)
+        delay = rate_limit_delay(r.status_code, r.headers, r.content)
+        if delay is None or attempt == 3:
+            break
+        # Runs in a worker thread (asyncio.to_thread), so blocking here is fine
+        print(f"GraphQL rate limited (status={r.status_code}), retrying in {delay:.0f}s")
+        time.sleep(delay)
     r.raise_for_status()
-    data = r.json()
+    data = orjson.loads(r.content)
     if "errors" in data:
         print(f"GraphQL errors: {data['errors']}")
     return data.get("data", {})
 
 
+def load_cache():
+    try:
+        with open(CACHE_PATH, "rb") as f:
+            HTTP_CACHE.update(orjson.loads(f.read()))
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        pass
+    print(f"Loaded {len(HTTP_CACHE)} cached responses from {CACHE_PATH}")
+
+
+def save_cache():
+    with open(CACHE_PATH, "wb") as f:
+        f.write(orjson.dumps(HTTP_CACHE))
+
+
 def get_user_repos():
-    """Get user's own repos (for stars + contribution scanning)."""
+    """Get user's own repos (for stars + contribution scanning), following the repositories cursor."""
     query = """
-    query($login: String!) {
+    query($login: String!, $cursor: String) {
       user(login: $login) {
-        repositories(first: 100, ownerAffiliations: OWNER, isFork: false) {
+        repositories(first: 100, after: $cursor, ownerAffiliations: OWNER, isFork: false) {
+          pageInfo {
+            endCursor
+            hasNextPage
+          }
           nodes {
             nameWithOwner
             stargazerCount
@@ -83,50 +167,71 @@ def get_user_repos():
       }
     }
     """
-    data = graphql(query, {"login": USERNAME})
-    return data.get("user", {}).get("repositories", {}).get("nodes", [])
-
-
-def get_contributions_for_year(year):
-    """Get contributions for a specific year using date range."""
+    repos = []
+    cursor = None
+    while True:
+        data = graphql(query, {"login": USERNAME, "cursor": cursor})
+        page = data.get("user", {}).get("repositories", {})
+        repos.extend(page.get("nodes", []))
+        page_info = page.get("pageInfo", {})
+        if not page_info.get("hasNextPage"):
+            return repos
+        cursor = page_info["endCursor"]
+
+
+def year_date_range(year, now):
+    """Get (from, to) DateTime strings covering a year, clamped to now."""
     from_date = f"{year}-01-01T00:00:00Z"
     to_date = f"{year}-12-31T23:59:59Z"
 
     # Clamp to now if year is current year
-    now = datetime.utcnow()
     if year == now.year:
-        to_date = now.strftime("%Y-%m-%dT%H:%M:%SZ")
+        to_date = now.isoformat(timespec="seconds").replace("+00:00", "Z")
+    return from_date, to_date
 
-    query = """
-    query($login: String!, $from: DateTime!, $to: DateTime!) {
-      user(login: $login) {
-        contributionsCollection(from: $from, to: $to) {
+
+def get_all_time_contributions():
+    """
+    Sum contributions across all years from START_YEAR to now.
+    Every year is an aliased contributionsCollection (y2016, y2017, ...),
+    GRAPHQL_ALIAS_LIMIT years per GraphQL query (so a single one today).
+    """
+    now = datetime.now(timezone.utc)
+    years = range(START_YEAR, now.year + 1)
+    totals = {"commits": 0, "prs": 0, "issues": 0}
+
+    user = {}
+    for start in range(0, len(years), GRAPHQL_ALIAS_LIMIT):
+        params = ["$login: String!"]
+        collections = []
+        variables = {"login": USERNAME}
+        for year in years[start:start + GRAPHQL_ALIAS_LIMIT]:
+            params.append(f"$from{year}: DateTime!, $to{year}: DateTime!")
+            collections.append(f"""
+        y{year}: contributionsCollection(from: $from{year}, to: $to{year}) {{
           totalCommitContributions
           restrictedContributionsCount
           totalPullRequestContributions
           totalIssueContributions
-        }
-      }
-    }
+        }}""")
+            variables[f"from{year}"], variables[f"to{year}"] = year_date_range(year, now)
+
+        query = f"""
+    query({", ".join(params)}) {{
+      user(login: $login) {{{"".join(collections)}
+      }}
+    }}
     """
-    data = graphql(query, {"login": USERNAME, "from": from_date, "to": to_date})
-    contrib = data.get("user", {}).get("contributionsCollection", {})
-    return {
-        "commits": contrib.get("totalCommitContributions", 0) + contrib.get("restrictedContributionsCount", 0),
-        "prs": contrib.get("totalPullRequestContributions", 0),
-        "issues": contrib.get("totalIssueContributions", 0),
-    }
-
-
-def get_all_time_contributions():
-    """Sum contributions across all years from START_YEAR to now."""
-    current_year = datetime.utcnow().year
-    totals = {"commits": 0, "prs": 0, "issues": 0}
-
-    for year in range(START_YEAR, current_year + 1):
-        print(f"  {year}...", end=" ")
-        year_data = get_contributions_for_year(year)
-        print(f"commits={year_data['commits']}, prs={year_data['prs']}, issues={year_data['issues']}")
+        user.update(graphql(query, variables).get("user", {}))
+
+    for year in years:
+        contrib = user.get(f"y{year}", {})
+        year_data = {
+            "commits": contrib.get("totalCommitContributions", 0) + contrib.get("restrictedContributionsCount", 0),
+            "prs": contrib.get("totalPullRequestContributions", 0),
+            "issues": contrib.get("totalIssueContributions", 0),
+        }
+        print(f"  {year}... commits={year_data['commits']}, prs={year_data['prs']}, issues={year_data['issues']}")
         totals["commits"] += year_data["commits"]
         totals["prs"] += year_data["prs"]
         totals["issues"] += year_data["issues"]
@@ -134,65 +239,238 @@ def get_all_time_contributions():
     return totals
 
 
-def get_repo_stars(owner, name):
-    query = """
-    query($owner: String!, $name: String!) {
-      repository(owner: $owner, name: $name) {
-        stargazerCount
-      }
-    }
+def query_repositories(repo_full_names, fields):
+    """
+    Fetch the same fields for many repos with aliased GraphQL queries
+    (r0: repository(...), r1: ...), GRAPHQL_ALIAS_LIMIT repos per request.
+    Returns {repo_full_name: node}; node is {} for missing repos.
+    """
+    nodes = {}
+    for start in range(0, len(repo_full_names), GRAPHQL_ALIAS_LIMIT):
+        chunk = repo_full_names[start:start + GRAPHQL_ALIAS_LIMIT]
+        aliases = []
+        for i, repo_full in enumerate(chunk):
+            owner, name = repo_full.split("/")
+            aliases.append(f"r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) {{ {fields} }}")
+        data = graphql("query {\n  " + "\n  ".join(aliases) + "\n}")
+        for i, repo_full in enumerate(chunk):
+            nodes[repo_full] = data.get(f"r{i}") or {}
+    return nodes
+
+
+async def bounded(sem, coro):
+    """Run coro while holding a slot of the semaphore."""
+    async with sem:
+        return await coro
+
+
+def update_rate_limit(headers):
+    if "X-RateLimit-Remaining" in headers:
+        RATE_LIMIT["remaining"] = int(headers["X-RateLimit-Remaining"])
+        RATE_LIMIT["reset"] = int(headers.get("X-RateLimit-Reset", 0))
+
+
+async def fetch_rate_limit(session):
+    """Seed RATE_LIMIT from GET /rate_limit (this call is not counted against the limit)."""
+    async with session.get("https://api.github.com/rate_limit") as r:
+        if r.status != 200:
+            return
+        core = orjson.loads(await r.read())["resources"]["core"]
+    RATE_LIMIT["remaining"] = core["remaining"]
+    RATE_LIMIT["reset"] = core["reset"]
+    print(f"REST rate limit: {core['remaining']}/{core['limit']} remaining")
+
+
+async def acquire_rate_limit():
+    """
+    Reserve one REST request from the budget, sleeping until reset if it is spent.
+    If the budget left can't cover the outstanding work, each request gets its own
+    evenly spaced send time up to the reset instead of all firing at once.
     """
-    data = graphql(query, {"owner": owner, "name": name})
-    return data.get("repository", {}).get("stargazerCount", 0)
+    async with RATE_LIMIT_LOCK:
+        while RATE_LIMIT["remaining"] is not None and RATE_LIMIT["remaining"] <= 0:
+            delay = max(0, RATE_LIMIT["reset"] - time.time()) + 1
+            print(f"REST rate limit exhausted, sleeping {delay:.0f}s until reset")
+            await asyncio.sleep(delay)
+            if RATE_LIMIT["reset"] <= time.time():
+                RATE_LIMIT["remaining"] = None  # Refreshed by the next response
+
+        now = time.time()
+        send_at = now
+        remaining = RATE_LIMIT["remaining"]
+        if remaining is not None:
+            RATE_LIMIT["remaining"] -= 1
+            if remaining < RATE_LIMIT["outstanding"]:
+                send_at = max(now, RATE_LIMIT["next_send"])
+                interval = min(max(0, RATE_LIMIT["reset"] - send_at) / remaining, MAX_RETRY_WAIT)
+                RATE_LIMIT["next_send"] = send_at + interval
+        RATE_LIMIT["outstanding"] = max(0, RATE_LIMIT["outstanding"] - 1)
+
+    if send_at > now:
+        await asyncio.sleep(send_at - now)
+
+
+async def cached_get(session, url):
+    """
+    GET a REST url, revalidating any cached copy with If-None-Match / If-Modified-Since.
+    Returns (status, payload); a 304 is reported as 200 with the cached payload.
+    """
+    headers = {}
+    cached = HTTP_CACHE.get(url)
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    retries = 0
+    while True:
+        await acquire_rate_limit()
+        async with session.get(url, headers=headers) as r:
+            update_rate_limit(r.headers)
+            status = r.status
+            if status == 304:
+                return 200, cached["payload"]
+            if status == 200:
+                payload = orjson.loads(await r.read())
+                if "ETag" in r.headers or "Last-Modified" in r.headers:
+                    HTTP_CACHE[url] = {
+                        "etag": r.headers.get("ETag"),
+                        "last_modified": r.headers.get("Last-Modified"),
+                        "payload": payload,
+                    }
+                return 200, payload
+            rate_limited = status in (403, 429) and r.headers.get("X-RateLimit-Remaining") == "0"
+            retry_after = r.headers.get("Retry-After")
+            limit_delay = rate_limit_delay(status, r.headers, await r.read() if status in (403, 429) else b"")
+        if rate_limited:
+            continue  # acquire_rate_limit() waits for the reset
+        if retries >= 3:
+            return status, None
+        # Secondary rate limit: Retry-After, or at least a minute per GitHub's guidance
+        if limit_delay is not None:
+            retries += 1
+            delay = limit_delay
+            print(f"    [{url}] secondary rate limit, retrying in {delay:.0f}s")
+            await asyncio.sleep(delay)
+            continue
+        # Transient 5xx: mirror the GraphQL SESSION's Retry (same backoff, Retry-After on 503)
+        if status in RETRY_STATUSES:
+            retries += 1
+            if status == 503 and retry_after is not None:
+                delay = min(int(retry_after), MAX_RETRY_WAIT)
+            else:
+                delay = RETRY_BACKOFF * 2 ** (retries - 1) if retries > 1 else 0
+            await asyncio.sleep(delay)
+            continue
+        return status, None
 
 
-def get_contributor_stats(repo_full_name):
-    """Get lines changed by USERNAME. Returns (additions, deletions)."""
+async def poll_stats(session, repo_full_name):
+    """Request /stats/contributors once. Returns (status, contributors); 202 means still computing."""
     url = f"https://api.github.com/repos/{repo_full_name}/stats/contributors"
-    for attempt in range(20):
-        r = requests.get(url, headers=REST_HEADERS)
-        print(f"    [{repo_full_name}] attempt {attempt+1}: status={r.status_code}", end="")
-        if r.status_code == 200:
-            print(" OK")
-            break
-        if r.status_code == 202:
-            print(" (computing, retrying in 10s...)")
-            time.sleep(20)
-            continue
-        if r.status_code == 204:
-            print(" (empty repo)")
+    status, contributors = await cached_get(session, url)
+    # Tasks run concurrently, so each request is logged on a single line
+    prefix = f"    [{repo_full_name}] status={status}"
+    if status == 200:
+        print(f"{prefix} OK")
+    elif status == 202:
+        print(f"{prefix} (computing)")
+    elif status == 204:
+        print(f"{prefix} (empty repo)")
+    else:
+        print(f"{prefix} (unexpected)")
+    return status, contributors
+
+
+async def kick_stats(session, repo_full_name):
+    """First stats request for a repo, which also starts GitHub computing it if needed."""
+    # Cheap probe first: skip the expensive (often 202) stats endpoint
+    # for repos where USERNAME has no commits at all.
+    probe_url = f"https://api.github.com/repos/{repo_full_name}/commits?author={USERNAME}&per_page=1"
+    status, commits = await cached_get(session, probe_url)
+    if status == 200 and not commits:
+        print(f"    [{repo_full_name}] no commits by {USERNAME}, skipping stats")
+        return 204, None  # Nothing to count, same as an empty repo
+
+    return await poll_stats(session, repo_full_name)
+
+
+def lines_changed_by_user(repo_full_name, status, contributors):
+    """Get lines changed by USERNAME from a stats response. Returns (additions, deletions)."""
+    if status == 202:
+        # Still computing: fall back to last run's stats rather than counting 0/0
+        cached = HTTP_CACHE.get(f"https://api.github.com/repos/{repo_full_name}/stats/contributors")
+        if cached is None:
+            print(f"    [{repo_full_name}] gave up, stats still computing")
             return 0, 0
-        print(f" (unexpected)")
+        print(f"    [{repo_full_name}] stats still computing, using cached stats from last run")
+        status, contributors = 200, cached["payload"]
+    if status != 200:
         return 0, 0
 
-    if r.status_code != 200:
-        print(f"    [{repo_full_name}] gave up after 5 attempts")
-        return 0, 0
-
-    contributors = r.json()
     if not isinstance(contributors, list):
         print(f"    [{repo_full_name}] unexpected response type: {type(contributors)}")
         return 0, 0
 
-    for c in contributors:
-        author = c.get("author")
-        if author is None:
-            continue
-        if author.get("login", "").lower() == USERNAME.lower():
-            additions = sum(w.get("a", 0) for w in c.get("weeks", []))
-            deletions = sum(w.get("d", 0) for w in c.get("weeks", []))
-            return additions, deletions
+    by_login = {c["author"].get("login", "").lower(): c for c in contributors if c.get("author")}
+    c = by_login.get(USERNAME_LC)
+    if c is None:
+        print(f"    [{repo_full_name}] user {USERNAME} not found in contributors list")
+        return 0, 0
 
-    print(f"    [{repo_full_name}] user {USERNAME} not found in contributors list")
-    return 0, 0
+    additions = deletions = 0
+    for w in c.get("weeks", []):
+        additions += w.get("a", 0)
+        deletions += w.get("d", 0)
+    return additions, deletions
 
 
-def get_repo_languages(repo_full_name):
-    url = f"https://api.github.com/repos/{repo_full_name}/languages"
-    r = requests.get(url, headers=REST_HEADERS)
-    if r.status_code != 200:
-        return {}
-    return r.json()
+async def scan_repos(repo_full_names):
+    """
+    Fetch lines changed for all repos concurrently. Returns {repo: (additions, deletions)}.
+    Every repo is kicked at once so GitHub computes cold stats in parallel,
+    then only the ones still at 202 are re-polled with exponential backoff
+    (capped at 32s) for up to STATS_POLL_BUDGET seconds.
+    """
+    sem = asyncio.Semaphore(SCAN_CONCURRENCY)
+    # One keep-alive pool for every REST call, sized to the scan's concurrency
+    connector = aiohttp.TCPConnector(limit_per_host=SCAN_CONCURRENCY)
+    async with aiohttp.ClientSession(headers=REST_HEADERS, connector=connector) as session:
+        await fetch_rate_limit(session)
+        RATE_LIMIT["outstanding"] += 2 * len(repo_full_names)  # Commit probe + first stats request
+        responses = await asyncio.gather(
+            *[bounded(sem, kick_stats(session, r)) for r in repo_full_names]
+        )
+        responses = dict(zip(repo_full_names, responses))
+
+        delay = 2
+        waited = 0
+        while waited < STATS_POLL_BUDGET:
+            pending = [r for r, (status, _) in responses.items() if status == 202]
+            if not pending:
+                break
+            print(f"  {len(pending)} repo(s) still computing stats, re-polling in {delay}s...")
+            await asyncio.sleep(delay)
+            waited += delay
+            RATE_LIMIT["outstanding"] += len(pending)
+            polled = await asyncio.gather(*[bounded(sem, poll_stats(session, r)) for r in pending])
+            responses.update(zip(pending, polled))
+            delay = min(delay * 2, 32)
+
+    return {r: lines_changed_by_user(r, status, contributors) for r, (status, contributors) in responses.items()}
+
+
+def get_repo_languages(repo_full_names):
+    """Get language byte counts for many repos via aliased GraphQL. Returns {repo: {lang: bytes}}."""
+    nodes = query_repositories(
+        repo_full_names,
+        "languages(first: 100, orderBy: {field: SIZE, direction: DESC}) { edges { size node { name } } }",
+    )
+    # Names repeat across every repo; interning keeps later dict probes cheap
+    return {
+        repo_full: {sys.intern(e["node"]["name"]): e["size"] for e in (node.get("languages") or {}).get("edges", [])}
+        for repo_full, node in nodes.items()
+    }
 
 
 LANG_COLORS = {
@@ -205,8 +483,38 @@ LANG_COLORS = {
     "Dart": "#00B4AB", "Kotlin": "#A97BFF", "Swift": "#F05138",
     "Ruby": "#701516", "PHP": "#4F5D95", "Cadence": "#00ef8b",
 }
+DEFAULT_LANG_COLOR = "#8b949e"  # For languages missing from LANG_COLORS
+
+
+# All icons normalized to 16x16 viewBox for consistent alignment
+ICONS = {
+    "star": '<svg x="0" y="-6" width="14" height="14" viewBox="0 0 16 16"><path d="M8 0.5l2.45 5.04 5.55 0.77-4.02 3.87 0.98 5.52L8 13.07l-4.96 2.63 0.98-5.52L0 6.31l5.55-0.77z" fill="#8b949e"/></svg>',
+    "commit": '<svg x="0" y="-6" width="14" height="14" viewBox="0 0 16 16"><circle cx="8" cy="8" r="3" stroke="#8b949e" stroke-width="1.6" fill="none"/><line x1="8" y1="11" x2="8" y2="16" stroke="#8b949e" stroke-width="1.6"/><line x1="8" y1="0" x2="8" y2="5" stroke="#8b949e" stroke-width="1.6"/></svg>',
+    "pr": '<svg x="0" y="-6" width="14" height="14" viewBox="0 0 16 16"><path d="M10 1l3 3-3 3" stroke="#8b949e" stroke-width="1.6" fill="none" stroke-linecap="round" stroke-linejoin="round"/><path d="M3 2v12M13 4H7a2 2 0 00-2 2v0" stroke="#8b949e" stroke-width="1.6" fill="none" stroke-linecap="round"/></svg>',
+    "issue": '<svg x="0" y="-6" width="14" height="14" viewBox="0 0 16 16"><circle cx="8" cy="8" r="6.5" stroke="#8b949e" stroke-width="1.4" fill="none"/><line x1="8" y1="4.5" x2="8" y2="8.5" stroke="#8b949e" stroke-width="1.8" stroke-linecap="round"/><circle cx="8" cy="11.5" r="1" fill="#8b949e"/></svg>',
+    "code": '<svg x="0" y="-6" width="14" height="14" viewBox="0 0 16 16"><path d="M5.5 3.5L1 8l4.5 4.5M10.5 3.5L15 8l-4.5 4.5" stroke="#8b949e" stroke-width="1.6" fill="none" stroke-linecap="round" stroke-linejoin="round"/></svg>',
+}
+
+# Per-row SVG snippets, built once at import and filled in with str.format
+STATS_ROW_TMPL = """
+        <g transform="translate(30, {y})">
+            {icon_svg}
+            <text x="24" y="2" fill="#8b949e" font-size="14" font-family="-apple-system, BlinkMacSystemFont, Segoe UI, Helvetica, Arial, sans-serif" dominant-baseline="middle">{label}</text>
+            <text x="{value_x}" y="2" fill="#c9d1d9" font-size="14" font-family="-apple-system, BlinkMacSystemFont, Segoe UI, Helvetica, Arial, sans-serif" text-anchor="end" font-weight="bold" dominant-baseline="middle">{value}</text>
+        </g>"""
+
+LANG_BAR_CLIP_TMPL = '<clipPath id="barClip"><rect x="30" y="{bar_y}" width="{bar_w}" height="{bar_h}" rx="4"/></clipPath>'
+
+LANG_BAR_RECT_TMPL = '<rect x="{x:.1f}" y="{y}" width="{width:.1f}" height="{height}" fill="{color}"/>'
+
+LANG_LABEL_TMPL = """
+        <g transform="translate({x}, {y})">
+            <circle cx="5" cy="-3" r="5" fill="{color}"/>
+            <text x="15" y="0" fill="#8b949e" font-size="12" font-family="-apple-system, BlinkMacSystemFont, Segoe UI, Helvetica, Arial, sans-serif"><tspan font-weight="600" fill="#c9d1d9">{lang}</tspan> {pct:.2f}%</text>
+        </g>"""
 
 
+@functools.lru_cache(maxsize=128)
 def format_number(n):
     return f"{n:,}"
 
@@ -220,31 +528,17 @@ def generate_stats_svg(stats):
         ("Lines of Code Changed", format_number(stats["lines_changed"]), "code"),
     ]
 
-    # All icons normalized to 16x16 viewBox for consistent alignment
-    icons = {
-        "star": '<svg x="0" y="-6" width="14" height="14" viewBox="0 0 16 16"><path d="M8 0.5l2.45 5.04 5.55 0.77-4.02 3.87 0.98 5.52L8 13.07l-4.96 2.63 0.98-5.52L0 6.31l5.55-0.77z" fill="#8b949e"/></svg>',
-        "commit": '<svg x="0" y="-6" width="14" height="14" viewBox="0 0 16 16"><circle cx="8" cy="8" r="3" stroke="#8b949e" stroke-width="1.6" fill="none"/><line x1="8" y1="11" x2="8" y2="16" stroke="#8b949e" stroke-width="1.6"/><line x1="8" y1="0" x2="8" y2="5" stroke="#8b949e" stroke-width="1.6"/></svg>',
-        "pr": '<svg x="0" y="-6" width="14" height="14" viewBox="0 0 16 16"><path d="M10 1l3 3-3 3" stroke="#8b949e" stroke-width="1.6" fill="none" stroke-linecap="round" stroke-linejoin="round"/><path d="M3 2v12M13 4H7a2 2 0 00-2 2v0" stroke="#8b949e" stroke-width="1.6" fill="none" stroke-linecap="round"/></svg>',
-        "issue": '<svg x="0" y="-6" width="14" height="14" viewBox="0 0 16 16"><circle cx="8" cy="8" r="6.5" stroke="#8b949e" stroke-width="1.4" fill="none"/><line x1="8" y1="4.5" x2="8" y2="8.5" stroke="#8b949e" stroke-width="1.8" stroke-linecap="round"/><circle cx="8" cy="11.5" r="1" fill="#8b949e"/></svg>',
-        "code": '<svg x="0" y="-6" width="14" height="14" viewBox="0 0 16 16"><path d="M5.5 3.5L1 8l4.5 4.5M10.5 3.5L15 8l-4.5 4.5" stroke="#8b949e" stroke-width="1.6" fill="none" stroke-linecap="round" stroke-linejoin="round"/></svg>',
-    }
-
     row_height = 30
     padding_top = 68
     card_height = 220
     card_width = 459
     value_x = card_width - 60
 
-    rows_svg = ""
+    rows = []
     for i, (label, value, icon_key) in enumerate(items):
         y = padding_top + i * row_height
-        icon_svg = icons.get(icon_key, "")
-        rows_svg += f"""
-        <g transform="translate(30, {y})">
-            {icon_svg}
-            <text x="24" y="2" fill="#8b949e" font-size="14" font-family="-apple-system, BlinkMacSystemFont, Segoe UI, Helvetica, Arial, sans-serif" dominant-baseline="middle">{label}</text>
-            <text x="{value_x}" y="2" fill="#c9d1d9" font-size="14" font-family="-apple-system, BlinkMacSystemFont, Segoe UI, Helvetica, Arial, sans-serif" text-anchor="end" font-weight="bold" dominant-baseline="middle">{value}</text>
-        </g>"""
+        rows.append(STATS_ROW_TMPL.format(y=y, icon_svg=ICONS.get(icon_key, ""), label=label, value=value, value_x=value_x))
+    rows_svg = "".join(rows)
 
     svg = f"""<svg xmlns="http://www.w3.org/2000/svg" width="{card_width}" height="{card_height}" viewBox="0 0 {card_width} {card_height}" fill="none">
     <rect x="0.5" y="0.5" width="{card_width - 1}" height="{card_height - 1}" rx="6" fill="none" stroke="#21262d" stroke-width="1"/>
@@ -255,46 +549,44 @@ def generate_stats_svg(stats):
     return svg
 
 
-def generate_langs_svg(languages):
-    sorted_langs = sorted(languages.items(), key=lambda x: x[1], reverse=True)[:10]
+def generate_langs_svg(sorted_langs):
+    """Render the languages card from (lang, bytes) pairs, largest first."""
     total = sum(v for _, v in sorted_langs)
     if total == 0:
         return '<svg xmlns="http://www.w3.org/2000/svg"></svg>'
 
+    # Resolve color and share of total once so the bar and the labels agree
+    entries = [(lang, LANG_COLORS.get(lang, DEFAULT_LANG_COLOR), size / total) for lang, size in sorted_langs]
+
     card_width = 459
     bar_y = 52
     bar_height = 8
     padding_top = 76
 
     # Color bar with rounded ends
-    bar_svg = '<clipPath id="barClip"><rect x="30" y="{bar_y}" width="{bar_w}" height="{bar_h}" rx="4"/></clipPath>'.format(
-        bar_y=bar_y, bar_w=card_width - 60, bar_h=bar_height
-    )
-    bar_inner = ""
+    bar_parts = [
+        LANG_BAR_CLIP_TMPL.format(bar_y=bar_y, bar_w=card_width - 60, bar_h=bar_height),
+        '<g clip-path="url(#barClip)">',
+    ]
     x_offset = 30.0
     bar_width = card_width - 60
-    for lang, size in sorted_langs:
-        width = max((size / total) * bar_width, 1)
-        color = LANG_COLORS.get(lang, "#8b949e")
-        bar_inner += f'<rect x="{x_offset:.1f}" y="{bar_y}" width="{width:.1f}" height="{bar_height}" fill="{color}"/>'
+    for lang, color, frac in entries:
+        width = max(frac * bar_width, 1)
+        bar_parts.append(LANG_BAR_RECT_TMPL.format(x=x_offset, y=bar_y, width=width, height=bar_height, color=color))
         x_offset += width
-    bar_svg += f'<g clip-path="url(#barClip)">{bar_inner}</g>'
+    bar_parts.append("</g>")
+    bar_svg = "".join(bar_parts)
 
     # Two-column layout for language labels
-    labels_svg = ""
+    labels = []
     col_width = (card_width - 60) / 2
-    for i, (lang, size) in enumerate(sorted_langs):
-        pct = (size / total) * 100
+    for i, (lang, color, frac) in enumerate(entries):
         col = i % 2
         row = i // 2
         x = 30 + col * col_width
         y = padding_top + row * 22
-        color = LANG_COLORS.get(lang, "#8b949e")
-        labels_svg += f"""
-        <g transform="translate({x}, {y})">
-            <circle cx="5" cy="-3" r="5" fill="{color}"/>
-            <text x="15" y="0" fill="#8b949e" font-size="12" font-family="-apple-system, BlinkMacSystemFont, Segoe UI, Helvetica, Arial, sans-serif"><tspan font-weight="600" fill="#c9d1d9">{lang}</tspan> {pct:.2f}%</text>
-        </g>"""
+        labels.append(LANG_LABEL_TMPL.format(x=x, y=y, color=color, lang=lang, pct=frac * 100))
+    labels_svg = "".join(labels)
 
     num_rows = math.ceil(len(sorted_langs) / 2)
     card_height = 220
@@ -309,29 +601,46 @@ def generate_langs_svg(languages):
     return svg
 
 
-def main():
+def accumulate(label, repo_full_names, line_stats):
+    """Print lines changed per repo for one group of repos. Returns the group's (additions, deletions)."""
+    additions = deletions = 0
+    for repo_full in repo_full_names:
+        a, d = line_stats[repo_full]
+        print(f"  {repo_full}: +{a} -{d}")
+        additions += a
+        deletions += d
+    print(f"  SUBTOTAL {label}: +{additions} -{deletions} = {additions + deletions} lines")
+    return additions, deletions
+
+
+async def main():
     os.makedirs("profile", exist_ok=True)
+    load_cache()
+
+    # 1-3. All-time contributions, personal repos and star repos don't depend
+    # on each other, so their blocking GraphQL calls run concurrently in threads
+    print("Fetching all-time contributions, personal repos and star repos...")
+    totals, user_repos, star_repos = await asyncio.gather(
+        asyncio.to_thread(get_all_time_contributions),
+        asyncio.to_thread(get_user_repos),
+        asyncio.to_thread(query_repositories, STAR_REPOS, "stargazerCount"),
+    )
 
-    # 1. All-time commits, PRs, issues (looping through years)
-    print("Fetching all-time contributions (year by year)...")
-    totals = get_all_time_contributions()
+    # 1. All-time commits, PRs, issues (one aliased query across years)
     total_commits = totals["commits"]
     total_prs = totals["prs"]
     total_issues = totals["issues"]
     print(f"All-time totals: commits={total_commits}, prs={total_prs}, issues={total_issues}")
 
     # 2. Stars: personal repos
-    print("\nFetching personal repos...")
-    user_repos = get_user_repos()
     personal_stars = sum(r.get("stargazerCount", 0) for r in user_repos)
-    print(f"Personal repo stars: {personal_stars}")
+    print(f"\nPersonal repo stars: {personal_stars}")
 
     # 3. Stars: manually listed org repos
-    print("\nFetching star repos...")
+    print("\nStar repos:")
     org_stars = 0
-    for repo_full in STAR_REPOS:
-        owner, name = repo_full.split("/")
-        stars = get_repo_stars(owner, name)
+    for repo_full, repo in star_repos.items():
+        stars = repo.get("stargazerCount", 0)
         print(f"  {repo_full}: {stars} stars")
         org_stars += stars
 
@@ -340,53 +649,32 @@ def main():
 
     # 4. Lines changed + languages
     print("\nScanning contributions for lines changed + languages...")
-    total_additions = 0
-    total_deletions = 0
-    languages = {}
-    seen_repos = set()
+    languages = Counter()
+
+    # Unique work list: contribution repos not already scanned as personal
+    personal_names = [r["nameWithOwner"] for r in user_repos if r.get("nameWithOwner")]
+    personal = frozenset(personal_names)
+    contrib_names = [r for r in dict.fromkeys(CONTRIBUTION_REPOS) if r not in personal]
+
+    line_stats = await scan_repos(personal_names + contrib_names)
+    save_cache()
+    repo_langs = get_repo_languages([r for r, (a, d) in line_stats.items() if a + d > 0])
+    for langs in repo_langs.values():
+        languages.update(langs)
 
     # Personal repos
     print(f"\n--- Personal repos ({len(user_repos)}) ---")
-    personal_additions = 0
-    personal_deletions = 0
-    for repo in user_repos:
-        full_name = repo.get("nameWithOwner", "")
-        if not full_name:
-            continue
-        seen_repos.add(full_name)
-        a, d = get_contributor_stats(full_name)
-        print(f"  {full_name}: +{a} -{d}")
-        total_additions += a
-        total_deletions += d
-        personal_additions += a
-        personal_deletions += d
-        if a + d > 0:
-            langs = get_repo_languages(full_name)
-            for lang, bytes_count in langs.items():
-                languages[lang] = languages.get(lang, 0) + bytes_count
-    print(f"  SUBTOTAL personal: +{personal_additions} -{personal_deletions} = {personal_additions + personal_deletions} lines")
+    personal_additions, personal_deletions = accumulate("personal", personal_names, line_stats)
 
     # Defined contribution repos
     print(f"\n--- Contribution repos ({len(CONTRIBUTION_REPOS)}) ---")
-    contrib_additions = 0
-    contrib_deletions = 0
     for repo_full in CONTRIBUTION_REPOS:
-        if repo_full in seen_repos:
+        if repo_full in personal:
             print(f"  {repo_full}: (already counted in personal)")
-            continue
-        seen_repos.add(repo_full)
-        a, d = get_contributor_stats(repo_full)
-        print(f"  {repo_full}: +{a} -{d}")
-        total_additions += a
-        total_deletions += d
-        contrib_additions += a
-        contrib_deletions += d
-        if a + d > 0:
-            langs = get_repo_languages(repo_full)
-            for lang, bytes_count in langs.items():
-                languages[lang] = languages.get(lang, 0) + bytes_count
-    print(f"  SUBTOTAL contribution repos: +{contrib_additions} -{contrib_deletions} = {contrib_additions + contrib_deletions} lines")
+    contrib_additions, contrib_deletions = accumulate("contribution repos", contrib_names, line_stats)
 
+    total_additions = personal_additions + contrib_additions
+    total_deletions = personal_deletions + contrib_deletions
     lines_changed = total_additions + total_deletions
 
     stats = {
@@ -399,11 +687,11 @@ def main():
 
     print(f"\n{'='*50}")
     print(f"Final stats: {json.dumps(stats, indent=2)}")
-    top_langs = dict(sorted(languages.items(), key=lambda x: x[1], reverse=True)[:10])
-    print(f"Top languages: {json.dumps(top_langs, indent=2)}")
+    top_langs = languages.most_common(10)
+    print(f"Top languages: {json.dumps(dict(top_langs), indent=2)}")
 
     stats_svg = generate_stats_svg(stats)
-    langs_svg = generate_langs_svg(languages)
+    langs_svg = generate_langs_svg(top_langs)
 
     with open("profile/stats.svg", "w") as f:
         f.write(stats_svg)
@@ -414,4 +702,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file